@@ -2921,12 +2921,13 @@ class Pivx(Coin):
     @classmethod
     def static_header_len(cls, height):
         '''Given a header height return its length.'''
-        if (height >= cls.ZEROCOIN_START_HEIGHT
-                and height < cls.ZEROCOIN_END_HEIGHT) \
-                or (height >= cls.SAPLING_START_HEIGHT):
+        # Test the Sapling era first: it covers the chain tip and so every
+        # block processed once synced.
+        if (height >= cls.SAPLING_START_HEIGHT
+                or cls.ZEROCOIN_START_HEIGHT <= height
+                < cls.ZEROCOIN_END_HEIGHT):
             return cls.EXPANDED_HEADER
-        else:
-            return cls.BASIC_HEADER_SIZE
+        return cls.BASIC_HEADER_SIZE
 
     @classmethod
     def header_hash(cls, header):
@@ -2955,16 +2956,6 @@ class PivxTestnet(Pivx):
     ZEROCOIN_BLOCK_VERSION = 4
     SAPLING_START_HEIGHT = 201
 
-    @classmethod
-    def static_header_len(cls, height):
-        '''Given a header height return its length.'''
-        if (height >= cls.ZEROCOIN_START_HEIGHT
-                and height < cls.ZEROCOIN_END_HEIGHT) \
-                or (height >= cls.SAPLING_START_HEIGHT):
-            return cls.EXPANDED_HEADER
-        else:
-            return cls.BASIC_HEADER_SIZE
-
 
 class Bitg(Coin):
 
@@ -29,6 +29,7 @@
 
 from dataclasses import dataclass
 from hashlib import blake2s
+from struct import Struct
 from typing import Sequence, Optional, Tuple
 
 from electrumx.lib.hash import sha256, double_sha256, hash_to_hex_str
@@ -43,6 +44,9 @@ from electrumx.lib.util import (
 ZERO = bytes(32)
 MINUS_1 = 4294967295
 
+# prev_hash, prev_idx and the first byte of the script length varint
+_unpack_input_prefix_from = Struct('<32sIB').unpack_from
+
 
 class SkipTxDeserialize(Exception):
     '''Exception used to indicate transactions that should be skipped
@@ -167,10 +171,20 @@ class Deserializer:
         return [read_input() for i in range(self._read_varint())]
 
     def _read_input(self):
+        cursor = self.cursor
+        prev_hash, prev_idx, script_len = _unpack_input_prefix_from(
+            self.binary, cursor)
+        if script_len < 253:
+            # Single byte varint; nearly all scripts are this short
+            self.cursor = cursor + 37
+            script = self._read_nbytes(script_len)
+        else:
+            self.cursor = cursor + 36
+            script = self._read_varbytes()
         return TxInput(
-            prev_hash=self._read_nbytes(32),
-            prev_idx=self._read_le_uint32(),
-            script=self._read_varbytes(),
+            prev_hash=prev_hash,
+            prev_idx=prev_idx,
+            script=script,
             sequence=self._read_le_uint32(),
         )
 
@@ -534,26 +548,241 @@ class DeserializerZcash(DeserializerEquihash):
         return base_tx
 
 
-@dataclass(kw_only=True, slots=True)
-class SaplingSpend:
+def _sapling_struct(*spans):
+    '''Return the Struct of a Sapling description whose fields occupy the
+    given contiguous (start, end) spans in serialization order.'''
+    assert all(prev[1] == span[0] for prev, span in zip(spans, spans[1:]))
+    return Struct('<' + ''.join(f'{end - start}s' for start, end in spans))
+
+
+def _sapling_field(start, end):
+    '''Return a property slicing bytes [start:end) of a Sapling description
+    out of the buffer it was deserialized from.'''
+    def getter(self):
+        off = self._off
+        return self._buf[off + start:off + end]
+    return property(getter)
+
+
+class _SaplingDescription:
+    '''Base of the Sapling spend and output classes.
+
+    A description is a view onto its serialized bytes; fields are sliced
+    out on access so deserializing one creates a single object.  The
+    buffer is always bytes, owned by the description or its batch.  The
+    public fields are read-only properties and equal descriptions hash
+    equal; the underscored slots are not guarded and must not be rebound.
+    '''
+    __slots__ = ('_buf', '_off')
+
+    SIZE = 0
+    FIELDS = Struct('')
+
+    def __init__(self, *fields):
+        raw = b''.join(fields)
+        assert len(raw) == self.SIZE
+        self._buf = raw
+        self._off = 0
+
+    @classmethod
+    def _view(cls, buf, off):
+        '''Return a description over the SIZE bytes of buf at off.'''
+        desc = cls.__new__(cls)
+        desc._buf = buf
+        desc._off = off
+        return desc
+
+    @property
+    def raw(self):
+        off = self._off
+        return self._buf[off:off + self.SIZE]
+
+    def unpack(self):
+        '''Return all fields as a tuple in serialization order.
+
+        Cheaper than reading several of the field properties.
+        '''
+        return self.FIELDS.unpack_from(self._buf, self._off)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.raw == other.raw
+
+    def __hash__(self):
+        return hash(self.raw)
+
+
+class SaplingSpend(_SaplingDescription):
     '''Class representing a PIVX Sapling spend.'''
-    cv: bytes           # 32 bytes - value commitment
-    anchor: bytes       # 32 bytes - Merkle tree root
-    nullifier: bytes    # 32 bytes - spent note identifier
-    rk: bytes           # 32 bytes - randomized public key
-    zkproof: bytes      # 192 bytes - Groth16 proof
-    spend_auth_sig: bytes  # 64 bytes - signature
+    __slots__ = ()
 
+    # Field (start, end) offsets; the single source of the layout
+    CV = (0, 32)
+    ANCHOR = (32, 64)
+    NULLIFIER = (64, 96)
+    RK = (96, 128)
+    ZKPROOF = (128, 320)
+    SPEND_AUTH_SIG = (320, 384)
 
-@dataclass(kw_only=True, slots=True)
-class SaplingOutput:
+    FIELDS = _sapling_struct(CV, ANCHOR, NULLIFIER, RK, ZKPROOF,
+                             SPEND_AUTH_SIG)
+    SIZE = FIELDS.size  # 32+32+32+32+192+64
+
+    def __init__(self, *, cv, anchor, nullifier, rk, zkproof, spend_auth_sig):
+        super().__init__(cv, anchor, nullifier, rk, zkproof, spend_auth_sig)
+
+    cv = _sapling_field(*CV)                          # value commitment
+    anchor = _sapling_field(*ANCHOR)                  # Merkle tree root
+    nullifier = _sapling_field(*NULLIFIER)            # spent note identifier
+    rk = _sapling_field(*RK)                          # randomized public key
+    zkproof = _sapling_field(*ZKPROOF)                # Groth16 proof
+    spend_auth_sig = _sapling_field(*SPEND_AUTH_SIG)  # signature
+
+    def __repr__(self):
+        return f'SaplingSpend(nullifier={self.nullifier.hex()})'
+
+
+class SaplingOutput(_SaplingDescription):
     '''Class representing a PIVX Sapling output.'''
-    cv: bytes           # 32 bytes - value commitment
-    cmu: bytes          # 32 bytes - note commitment (indexed)
-    ephemeral_key: bytes  # 32 bytes
-    enc_ciphertext: bytes  # 580 bytes
-    out_ciphertext: bytes  # 80 bytes
-    zkproof: bytes      # 192 bytes
+    __slots__ = ()
+
+    # Field (start, end) offsets; the single source of the layout
+    CV = (0, 32)
+    CMU = (32, 64)
+    EPHEMERAL_KEY = (64, 96)
+    ENC_CIPHERTEXT = (96, 676)
+    OUT_CIPHERTEXT = (676, 756)
+    ZKPROOF = (756, 948)
+
+    FIELDS = _sapling_struct(CV, CMU, EPHEMERAL_KEY, ENC_CIPHERTEXT,
+                             OUT_CIPHERTEXT, ZKPROOF)
+    SIZE = FIELDS.size  # 32+32+32+580+80+192
+
+    def __init__(self, *, cv, cmu, ephemeral_key, enc_ciphertext,
+                 out_ciphertext, zkproof):
+        super().__init__(cv, cmu, ephemeral_key, enc_ciphertext,
+                         out_ciphertext, zkproof)
+
+    cv = _sapling_field(*CV)                # value commitment
+    cmu = _sapling_field(*CMU)              # note commitment (indexed)
+    ephemeral_key = _sapling_field(*EPHEMERAL_KEY)
+    enc_ciphertext = _sapling_field(*ENC_CIPHERTEXT)
+    out_ciphertext = _sapling_field(*OUT_CIPHERTEXT)
+    zkproof = _sapling_field(*ZKPROOF)
+
+    def __repr__(self):
+        return f'SaplingOutput(cmu={self.cmu.hex()})'
+
+
+class _SaplingBatch(Sequence):
+    '''Base of the Sapling spend and output vector classes.
+
+    A batch covers a vector of contiguous serialized descriptions.  Items
+    are returned as views, and columns are read by striding over the
+    buffer without creating a view per item.  Slices are batches, and a
+    batch compares equal to any sequence of equal descriptions.
+    '''
+    __slots__ = ('_buf', '_off', '_count')
+
+    ITEM = _SaplingDescription
+
+    def __init__(self, buf, off, count):
+        self._buf = buf
+        self._off = off
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            count = len(range(start, stop, step))
+            size = self.ITEM.SIZE
+            if step == 1:
+                return self.__class__(self._buf, self._off + start * size,
+                                      count)
+            buf = b''.join(self[i].raw for i in range(start, stop, step))
+            return self.__class__(buf, 0, count)
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('Sapling batch index out of range')
+        return self.ITEM._view(self._buf, self._off + index * self.ITEM.SIZE)
+
+    def __iter__(self):
+        view = self.ITEM._view
+        buf = self._buf
+        size = self.ITEM.SIZE
+        start = self._off
+        return (view(buf, off)
+                for off in range(start, start + self._count * size, size))
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return (len(self) == len(other)
+                and all(a == b for a, b in zip(self, other)))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({list(self)!r})'
+
+    def _field(self, index, start, end):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('Sapling batch index out of range')
+        off = self._off + index * self.ITEM.SIZE
+        return self._buf[off + start:off + end]
+
+    def _column(self, start, end):
+        buf = self._buf
+        size = self.ITEM.SIZE
+        first = self._off + start
+        length = end - start
+        return [buf[off:off + length]
+                for off in range(first, first + self._count * size, size)]
+
+
+class SaplingSpendBatch(_SaplingBatch):
+    '''The vector of Sapling spends of a transaction.'''
+    __slots__ = ()
+
+    ITEM = SaplingSpend
+
+    def nullifier(self, index):
+        return self._field(index, *SaplingSpend.NULLIFIER)
+
+    def nullifiers(self):
+        '''Return a list of the nullifiers of all spends.'''
+        return self._column(*SaplingSpend.NULLIFIER)
+
+    def anchors(self):
+        '''Return a list of the anchors of all spends.
+
+        Spends against the same tree state share an anchor, so equal
+        anchors in the list are made one object.
+        '''
+        interned = {}
+        return [interned.setdefault(anchor, anchor)
+                for anchor in self._column(*SaplingSpend.ANCHOR)]
+
+
+class SaplingOutputBatch(_SaplingBatch):
+    '''The vector of Sapling outputs of a transaction.'''
+    __slots__ = ()
+
+    ITEM = SaplingOutput
+
+    def cmu(self, index):
+        return self._field(index, *SaplingOutput.CMU)
+
+    def cmus(self):
+        '''Return a list of the note commitments of all outputs.'''
+        return self._column(*SaplingOutput.CMU)
 
 
 @dataclass(kw_only=True, slots=True)
@@ -561,6 +790,11 @@ class TxPIVX(Tx):
     '''Class representing a PIVX transaction.'''
     txtype: int
 
+    @property
+    def txid_hex_be(self):
+        '''The txid in display (byte-reversed hex) form.'''
+        return hash_to_hex_str(self.txid)
+
     def serialize(self):
         return b''.join((
             pack_le_uint16(self.version),
@@ -577,44 +811,65 @@ class TxPIVX(Tx):
 class TxPIVXSapling(TxPIVX):
     '''Class representing a PIVX Sapling transaction with shielded data.'''
     value_balance: int  # 8 bytes - net value of shielded section
-    sapling_spends: Sequence[SaplingSpend]
-    sapling_outputs: Sequence[SaplingOutput]
+    sapling_spends: Sequence[SaplingSpend]  # SaplingSpendBatch if parsed
+    sapling_outputs: Sequence[SaplingOutput]  # SaplingOutputBatch if parsed
     binding_sig: bytes  # 64 bytes
 
 
+# locktime, single byte nExpiryHeight varint, valueBalance
+_unpack_sapling_tail_from = Struct('<IBq').unpack_from
+
+
 class DeserializerPIVX(Deserializer):
     '''Deserializer for PIVX transactions including Sapling shielded transactions.'''
 
     # Sapling component sizes
-    SAPLING_SPEND_SIZE = 384  # 32+32+32+32+192+64
-    SAPLING_OUTPUT_SIZE = 948  # 32+32+32+580+80+192
-
-    def _read_sapling_spend(self) -> SaplingSpend:
-        '''Read a single Sapling spend (384 bytes).'''
-        return SaplingSpend(
-            cv=self._read_nbytes(32),
-            anchor=self._read_nbytes(32),
-            nullifier=self._read_nbytes(32),
-            rk=self._read_nbytes(32),
-            zkproof=self._read_nbytes(192),
-            spend_auth_sig=self._read_nbytes(64),
-        )
+    SAPLING_SPEND_SIZE = SaplingSpend.SIZE
+    SAPLING_OUTPUT_SIZE = SaplingOutput.SIZE
 
-    def _read_sapling_output(self) -> SaplingOutput:
-        '''Read a single Sapling output (948 bytes).'''
-        return SaplingOutput(
-            cv=self._read_nbytes(32),
-            cmu=self._read_nbytes(32),
-            ephemeral_key=self._read_nbytes(32),
-            enc_ciphertext=self._read_nbytes(580),
-            out_ciphertext=self._read_nbytes(80),
-            zkproof=self._read_nbytes(192),
-        )
+    def __init__(self, binary, start=0):
+        # Any bytes-like object is accepted so callers need not copy into
+        # bytes.  Nothing parsed may alias it: _read_nbytes() returns bytes
+        # and Sapling vectors are copied out by _sapling_vector().
+        if not isinstance(binary, bytes):
+            binary = memoryview(binary).cast('B')
+        self.binary = binary
+        self._binary_length = len(binary)
+        self.cursor = start
 
-    def read_tx(self):
-        orig_start = self.cursor
-        start = self.cursor
-        header = self._read_le_uint32()
+    def _read_nbytes(self, n):
+        cursor = self.cursor
+        self.cursor = end = cursor + n
+        assert self._binary_length >= end
+        return bytes(self.binary[cursor:end])
+
+    def _sapling_vector(self, count, size):
+        '''Advance over count descriptions of size bytes, returning the
+        (buffer, offset) pair a batch over them should hold.'''
+        cursor = self.cursor
+        self.cursor = end = cursor + count * size
+        assert self._binary_length >= end
+        binary = self.binary
+        if isinstance(binary, bytes):
+            return binary, cursor
+        # Copy the vector once rather than alias the caller's buffer
+        return bytes(binary[cursor:end]), 0
+
+    def _read_sapling_spends(self) -> SaplingSpendBatch:
+        '''Read a vector of Sapling spends (384 bytes each).'''
+        count = self._read_varint()
+        buf, off = self._sapling_vector(count, self.SAPLING_SPEND_SIZE)
+        return SaplingSpendBatch(buf, off, count)
+
+    def _read_sapling_outputs(self) -> SaplingOutputBatch:
+        '''Read a vector of Sapling outputs (948 bytes each).'''
+        count = self._read_varint()
+        buf, off = self._sapling_vector(count, self.SAPLING_OUTPUT_SIZE)
+        return SaplingOutputBatch(buf, off, count)
+
+    @staticmethod
+    def _version_and_type(header):
+        '''Return the (version, tx_type) pair of a tx header.'''
         tx_type = header >> 16  # DIP2 tx type
         if tx_type:
             version = header & 0x0000ffff
@@ -624,50 +879,192 @@ class DeserializerPIVX(Deserializer):
         if tx_type and version < 3:
             version = header
             tx_type = 0
+        return version, tx_type
+
+    def _read_version_and_type(self):
+        '''Read the tx header, returning a (version, tx_type) pair.'''
+        return self._version_and_type(self._read_le_uint32())
+
+    def _skip_inputs(self):
+        read_varint = self._read_varint
+        for _ in range(read_varint()):
+            self.cursor += 36  # prev_hash, prev_idx
+            script_len = read_varint()
+            self.cursor += script_len + 4  # script, sequence
+
+    def _skip_outputs(self):
+        read_varint = self._read_varint
+        for _ in range(read_varint()):
+            self.cursor += 8  # value
+            script_len = read_varint()
+            self.cursor += script_len  # pk_script
+
+    def _skip_to_sapling_data(self):
+        '''Skip the transparent part of a transaction.
+
+        Return its tx type if Sapling data follows, otherwise None.
+        '''
+        version, tx_type = self._read_version_and_type()
+        self._skip_inputs()
+        self._skip_outputs()
+        self.cursor += 4  # locktime
+        if version < 3:
+            assert self._binary_length >= self.cursor
+            return None
+        self._read_varint()  # nExpiryHeight (unused)
+        self.cursor += 8  # valueBalance
+        return tx_type
+
+    def _skip_sapling_trailer(self, tx_type):
+        self.cursor += 64  # bindingSig
+        if tx_type > 0:
+            self.cursor += 2  # extraPayload
+        assert self._binary_length >= self.cursor
+
+    def _skip_tx(self):
+        tx_type = self._skip_to_sapling_data()
+        if tx_type is not None:
+            self._read_sapling_spends()
+            self._read_sapling_outputs()
+            self._skip_sapling_trailer(tx_type)
+
+    @classmethod
+    def scan_tx_spans(cls, raw, start, count):
+        '''Return the (start, end) offsets of count consecutive transactions
+        of raw beginning at start, without deserializing them.'''
+        deser = cls(raw, start)
+        spans = []
+        for _ in range(count):
+            tx_start = deser.cursor
+            deser._skip_tx()
+            spans.append((tx_start, deser.cursor))
+        return spans
+
+    @classmethod
+    def read_tx_spans(cls, raw, spans, executor=None):
+        '''Return the transactions of raw at the given spans.
+
+        The spans are independent so they are parsed with executor.map()
+        if an executor is given.  Parsing is pure Python and holds the GIL,
+        so only an executor that sidesteps it can parse in parallel.
+        '''
+        def read(span):
+            start, end = span
+            deser = cls(raw, start)
+            tx = deser.read_tx()
+            assert deser.cursor == end
+            return tx
+        mapper = map if executor is None else executor.map
+        return list(mapper(read, spans))
+
+    def read_tx_nullifiers_and_cmus(self):
+        '''Skip over a transaction returning a (nullifiers, cmus) pair.
+
+        A much cheaper alternative to read_tx() for callers that need only
+        the Sapling data that is indexed; nothing else is materialized.
+        '''
+        tx_type = self._skip_to_sapling_data()
+        if tx_type is None:
+            return [], []
+        nullifiers = self._read_sapling_spends().nullifiers()
+        cmus = self._read_sapling_outputs().cmus()
+        self._skip_sapling_trailer(tx_type)
+        return nullifiers, cmus
+
+    @classmethod
+    def read_block_nullifiers(cls, raw_block, start):
+        '''Return the nullifiers of all spends in a block concatenated.
+
+        start is the offset of the transaction count, i.e. the header
+        length.
+        '''
+        deser = cls(raw_block, start)
+        nullifiers = bytearray()
+        for _ in range(deser._read_varint()):
+            tx_type = deser._skip_to_sapling_data()
+            if tx_type is None:
+                continue
+            nullifiers += b''.join(deser._read_sapling_spends().nullifiers())
+            deser._read_sapling_outputs()
+            deser._skip_sapling_trailer(tx_type)
+        return bytes(nullifiers)
 
-        inputs = self._read_inputs()
-        outputs = self._read_outputs()
-        locktime = self._read_le_uint32()
+    @staticmethod
+    def nullifiers_are_unique(nullifiers):
+        '''Return True if no nullifier in the concatenation repeats.'''
+        seen = {nullifiers[i:i + 32] for i in range(0, len(nullifiers), 32)}
+        return len(seen) * 32 == len(nullifiers)
+
+    def _read_locktime_and_value_balance(self):
+        '''Read locktime, nExpiryHeight and valueBalance of a Sapling tx.
 
-        if version >= 3:  # >= sapling
-            self._read_varint()  # nExpiryHeight (unused)
-            value_balance = self._read_le_int64()
+        nExpiryHeight (unused) is nearly always a single byte varint,
+        letting the three be read with one unpack.
+        '''
+        cursor = self.cursor
+        if self.binary[cursor + 4] < 253:
+            locktime, _, value_balance = _unpack_sapling_tail_from(
+                self.binary, cursor)
+            self.cursor = cursor + 13
+            return locktime, value_balance
+        locktime = self._read_le_uint32()
+        self._read_varint()
+        return locktime, self._read_le_int64()
 
-            # Read Sapling spends
-            shielded_spend_count = self._read_varint()
-            sapling_spends = [self._read_sapling_spend()
-                              for _ in range(shielded_spend_count)]
+    def read_tx(self):
+        orig_start = self.cursor
+        header = self._read_le_uint32()
 
-            # Read Sapling outputs
-            shielded_output_count = self._read_varint()
-            sapling_outputs = [self._read_sapling_output()
-                               for _ in range(shielded_output_count)]
+        if header < 3:
+            # Pre-Sapling transactions make up most of the chain's history;
+            # they have no tx type and nothing follows the locktime.
+            inputs = self._read_inputs()
+            outputs = self._read_outputs()
+            locktime = self._read_le_uint32()
+            txid = self.TX_HASH_FN(self.binary[orig_start:self.cursor])
+            return TxPIVX(
+                version=header,
+                txtype=0,
+                inputs=inputs,
+                outputs=outputs,
+                locktime=locktime,
+                txid=txid,
+                wtxid=txid,
+            )
 
-            # Read binding signature (always present for v3+)
-            binding_sig = self._read_nbytes(64)
+        # Any other header decodes to version >= 3 (Sapling)
+        version, tx_type = self._version_and_type(header)
+        inputs = self._read_inputs()
+        outputs = self._read_outputs()
+        locktime, value_balance = self._read_locktime_and_value_balance()
 
-            if tx_type > 0:
-                self.cursor += 2  # extraPayload
+        sapling_spends = self._read_sapling_spends()
+        sapling_outputs = self._read_sapling_outputs()
 
-            txid = self.TX_HASH_FN(self.binary[orig_start:self.cursor])
+        # Read binding signature (always present for v3+)
+        binding_sig = self._read_nbytes(64)
 
-            # Return TxPIVXSapling if there's shielded data, otherwise TxPIVX
-            if sapling_spends or sapling_outputs:
-                return TxPIVXSapling(
-                    version=version,
-                    txtype=tx_type,
-                    inputs=inputs,
-                    outputs=outputs,
-                    locktime=locktime,
-                    txid=txid,
-                    wtxid=txid,
-                    value_balance=value_balance,
-                    sapling_spends=sapling_spends,
-                    sapling_outputs=sapling_outputs,
-                    binding_sig=binding_sig,
-                )
+        if tx_type > 0:
+            self.cursor += 2  # extraPayload
 
         txid = self.TX_HASH_FN(self.binary[orig_start:self.cursor])
+
+        # Return TxPIVXSapling if there's shielded data, otherwise TxPIVX
+        if sapling_spends or sapling_outputs:
+            return TxPIVXSapling(
+                version=version,
+                txtype=tx_type,
+                inputs=inputs,
+                outputs=outputs,
+                locktime=locktime,
+                txid=txid,
+                wtxid=txid,
+                value_balance=value_balance,
+                sapling_spends=sapling_spends,
+                sapling_outputs=sapling_outputs,
+                binding_sig=binding_sig,
+            )
+
         return TxPIVX(
             version=version,
             txtype=tx_type,
@@ -2923,14 +2923,16 @@ class PIVXSaplingElectrumX(ElectrumX):
                     if isinstance(tx, TxPIVXSapling) and (
                         tx.sapling_outputs or tx.sapling_spends
                     ):
-                        txid_hex = hash_to_hex_str(tx.txid)
+                        txid_hex = tx.txid_hex_be
                         # Compact outputs (for receiving)
                         compact_outputs = []
                         for output_index, output in enumerate(tx.sapling_outputs):
+                            (cv, cmu, epk, enc_ciphertext, out_ciphertext,
+                             _zkproof) = output.unpack()
                             try:
                                 commitment_info = (
                                     self.db.get_commitment_position_info(
-                                        output.cmu)
+                                        cmu)
                                 )
                             except self.db.DBError as e:
                                 return self._sapling_range_error_response(
@@ -2942,7 +2944,7 @@ class PIVXSaplingElectrumX(ElectrumX):
                                     txid=txid_hex,
                                     tx_index=tx_index,
                                     output_index=output_index,
-                                    commitment=output.cmu.hex())
+                                    commitment=cmu.hex())
                             if commitment_info is None:
                                 return self._sapling_range_error_response(
                                     start_height, end_height, blocks,
@@ -2953,7 +2955,7 @@ class PIVXSaplingElectrumX(ElectrumX):
                                     txid=txid_hex,
                                     tx_index=tx_index,
                                     output_index=output_index,
-                                    commitment=output.cmu.hex())
+                                    commitment=cmu.hex())
                             _tx_hash, _idx, _h, position = commitment_info
                             if position is None:
                                 return self._sapling_range_error_response(
@@ -2965,20 +2967,20 @@ class PIVXSaplingElectrumX(ElectrumX):
                                     txid=txid_hex,
                                     tx_index=tx_index,
                                     output_index=output_index,
-                                    commitment=output.cmu.hex())
+                                    commitment=cmu.hex())
                             output_data = {
                                 'position': position,
                                 'global_position': position,
                                 'txid': txid_hex,
                                 'tx_index': tx_index,
                                 'output_index': output_index,
-                                'cmu': output.cmu.hex(),
-                                'epk': output.ephemeral_key.hex(),
-                                'ephemeral_key': output.ephemeral_key.hex(),
-                                'ciphertext': output.enc_ciphertext.hex(),
-                                'enc_ciphertext': output.enc_ciphertext.hex(),
-                                'cv': output.cv.hex(),
-                                'out_ciphertext': output.out_ciphertext.hex(),
+                                'cmu': cmu.hex(),
+                                'epk': epk.hex(),
+                                'ephemeral_key': epk.hex(),
+                                'ciphertext': enc_ciphertext.hex(),
+                                'enc_ciphertext': enc_ciphertext.hex(),
+                                'cv': cv.hex(),
+                                'out_ciphertext': out_ciphertext.hex(),
                             }
                             compact_outputs.append(output_data)
                             block_outputs.append(output_data)
@@ -2986,11 +2988,12 @@ class PIVXSaplingElectrumX(ElectrumX):
                         # Compact spends/nullifiers (for sync)
                         compact_spends = []
                         for spend_index, spend in enumerate(tx.sapling_spends):
+                            cv, anchor, nullifier, rk, _, _ = spend.unpack()
                             compact_spends.append({
-                                'nullifier': spend.nullifier.hex(),
-                                'cv': spend.cv.hex(),
-                                'anchor': spend.anchor.hex(),
-                                'rk': spend.rk.hex(),
+                                'nullifier': nullifier.hex(),
+                                'cv': cv.hex(),
+                                'anchor': anchor.hex(),
+                                'rk': rk.hex(),
                                 'spend_index': spend_index,
                             })
 
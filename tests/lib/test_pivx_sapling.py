@@ -6,8 +6,16 @@
 
 '''Unit tests for PIVX Sapling deserializer.'''
 
+import dataclasses
+import struct
+
+import pytest
+
 from electrumx.lib import tx as tx_lib
 
+_pack_u32 = struct.Struct('<I').pack
+_pack_i64 = struct.Struct('<q').pack
+
 
 class TestSaplingSpend:
     '''Tests for SaplingSpend dataclass.'''
@@ -28,6 +36,39 @@ class TestSaplingSpend:
         assert len(spend.zkproof) == 192
         assert len(spend.spend_auth_sig) == 64
 
+    def test_unpack(self):
+        fields = (b'\x01' * 32, b'\x02' * 32, b'\x03' * 32, b'\x04' * 32,
+                  b'\x05' * 192, b'\x06' * 64)
+        spend = tx_lib.SaplingSpend(
+            cv=fields[0],
+            anchor=fields[1],
+            nullifier=fields[2],
+            rk=fields[3],
+            zkproof=fields[4],
+            spend_auth_sig=fields[5],
+        )
+        assert spend.unpack() == fields
+
+    def test_hashable_and_read_only(self):
+        def make_spend(nullifier):
+            return tx_lib.SaplingSpend(
+                cv=bytes(32),
+                anchor=bytes(32),
+                nullifier=nullifier,
+                rk=bytes(32),
+                zkproof=bytes(192),
+                spend_auth_sig=bytes(64),
+            )
+        spends = {make_spend(b'\x01' * 32), make_spend(b'\x01' * 32),
+                  make_spend(b'\x02' * 32)}
+        assert len(spends) == 2
+
+        spend = make_spend(b'\x01' * 32)
+        with pytest.raises(AttributeError):
+            spend.nullifier = b'\x02' * 32
+        with pytest.raises(AttributeError):
+            spend.extra = 1
+
 
 class TestSaplingOutput:
     '''Tests for SaplingOutput dataclass.'''
@@ -48,6 +89,19 @@ class TestSaplingOutput:
         assert len(output.out_ciphertext) == 80
         assert len(output.zkproof) == 192
 
+    def test_unpack(self):
+        fields = (b'\x01' * 32, b'\x02' * 32, b'\x03' * 32, b'\x04' * 580,
+                  b'\x05' * 80, b'\x06' * 192)
+        output = tx_lib.SaplingOutput(
+            cv=fields[0],
+            cmu=fields[1],
+            ephemeral_key=fields[2],
+            enc_ciphertext=fields[3],
+            out_ciphertext=fields[4],
+            zkproof=fields[5],
+        )
+        assert output.unpack() == fields
+
 
 class TestTxPIVXSapling:
     '''Tests for TxPIVXSapling dataclass.'''
@@ -106,6 +160,17 @@ class TestTxPIVXSapling:
         assert tx.sapling_spends[0].nullifier == b'\x01' * 32
         assert tx.sapling_outputs[0].cmu == b'\x02' * 32
 
+    def test_txid_hex_be(self):
+        tx = tx_lib.TxPIVX(version=1, txtype=0, inputs=[], outputs=[],
+                           locktime=0, txid=None, wtxid=None)
+        tx.txid = bytes(range(32))
+        assert tx.txid_hex_be == bytes(range(32))[::-1].hex()
+        tx.txid = bytes(32)
+        assert tx.txid_hex_be == '00' * 32
+        assert ([f.name for f in dataclasses.fields(tx)]
+                == ['version', 'inputs', 'outputs', 'locktime', 'txid',
+                    'wtxid', 'txtype'])
+
 
 class TestDeserializerPIVXSizes:
     '''Tests for PIVX Sapling deserializer constants.'''
@@ -119,6 +184,19 @@ class TestDeserializerPIVXSizes:
         assert tx_lib.DeserializerPIVX.SAPLING_OUTPUT_SIZE == 948
 
 
+class TestNullifierUniqueness:
+    '''Tests for the batch nullifier uniqueness check.'''
+
+    def test_unique(self):
+        nullifiers = b''.join(bytes([i]) * 32 for i in range(4))
+        assert tx_lib.DeserializerPIVX.nullifiers_are_unique(nullifiers)
+        assert tx_lib.DeserializerPIVX.nullifiers_are_unique(b'')
+
+    def test_duplicate(self):
+        nullifiers = b''.join(bytes([i]) * 32 for i in (1, 2, 1))
+        assert not tx_lib.DeserializerPIVX.nullifiers_are_unique(nullifiers)
+
+
 class TestDeserializerPIVXPreSapling:
     '''Tests for pre-Sapling PIVX transaction parsing.'''
 
@@ -145,82 +223,70 @@ class TestDeserializerPIVXPreSapling:
         tx = deser.read_tx()
 
         # Should return TxPIVX not TxPIVXSapling
-        assert isinstance(tx, tx_lib.TxPIVX)
-        assert not isinstance(tx, tx_lib.TxPIVXSapling)
+        assert type(tx) is tx_lib.TxPIVX
         assert tx.version == 1
         assert tx.txtype == 0
         assert len(tx.inputs) == 1
         assert len(tx.outputs) == 1
 
+    def test_truncated_pre_sapling_tx(self):
+        # Missing its locktime
+        raw = bytes.fromhex(self.PRE_SAPLING_TX)[:-4]
+        DeserializerPIVX = tx_lib.DeserializerPIVX
+        with pytest.raises(AssertionError):
+            DeserializerPIVX(raw).read_tx_nullifiers_and_cmus()
+        with pytest.raises(AssertionError):
+            DeserializerPIVX.scan_tx_spans(raw, 0, 1)
+        with pytest.raises(AssertionError):
+            DeserializerPIVX.read_block_nullifiers(b'\x01' + raw, 0)
+
 
 class TestDeserializerPIVXSapling:
     '''Tests for Sapling PIVX transaction parsing with synthetic data.'''
 
     @staticmethod
-    def create_sapling_tx_hex(
+    def create_sapling_tx_bytes(
         num_spends=0,
         num_outputs=0,
         value_balance=0,
+        expiry=b'\x00',
     ):
-        '''Create a synthetic Sapling transaction for testing.'''
-        # Version 3 (Sapling)
-        header = "03000000"  # version 3, type 0
-
-        # Empty inputs
-        inputs = "00"
-
-        # Empty transparent outputs
-        outputs = "00"
-
-        # Locktime
-        locktime = "00000000"
-
-        # Expiry height (varint)
-        expiry_height = "00"
+        '''Create a synthetic Sapling transaction for testing.
 
-        # Value balance (8 bytes, little endian)
-        import struct
-        val_bal = struct.pack('<q', value_balance).hex()
-
-        # Sapling spends count
-        spend_count = format(num_spends, '02x') if num_spends < 253 else None
-        if spend_count is None:
+        expiry is the serialized nExpiryHeight varint.
+        '''
+        if num_spends >= 253:
             raise ValueError("Too many spends for simple test")
-
-        # Sapling spend data (384 bytes each)
-        spend_data = "00" * 384 * num_spends
-
-        # Sapling outputs count
-        output_count = format(num_outputs, '02x') if num_outputs < 253 else None
-        if output_count is None:
+        if num_outputs >= 253:
             raise ValueError("Too many outputs for simple test")
 
-        # Sapling output data (948 bytes each)
-        output_data = "00" * 948 * num_outputs
-
-        # Binding signature (64 bytes)
-        binding_sig = "00" * 64
-
-        return (header + inputs + outputs + locktime + expiry_height +
-                val_bal + spend_count + spend_data + output_count +
-                output_data + binding_sig)
+        return b''.join((
+            _pack_u32(3),  # version 3, type 0
+            b'\x00',  # Empty inputs
+            b'\x00',  # Empty transparent outputs
+            bytes(4),  # Locktime
+            expiry,  # Expiry height (varint)
+            _pack_i64(value_balance),  # Value balance
+            bytes([num_spends]),  # Sapling spends count
+            bytes(384 * num_spends),  # Sapling spend data
+            bytes([num_outputs]),  # Sapling outputs count
+            bytes(948 * num_outputs),  # Sapling output data
+            bytes(64),  # Binding signature
+        ))
 
     def test_empty_sapling_tx(self):
         '''Test Sapling transaction with no shielded data.'''
-        tx_hex = self.create_sapling_tx_hex()
-        raw = bytes.fromhex(tx_hex)
+        raw = self.create_sapling_tx_bytes()
         deser = tx_lib.DeserializerPIVX(raw)
         tx = deser.read_tx()
 
         # No shielded data, so should be TxPIVX not TxPIVXSapling
-        assert isinstance(tx, tx_lib.TxPIVX)
-        assert not isinstance(tx, tx_lib.TxPIVXSapling)
+        assert type(tx) is tx_lib.TxPIVX
         assert tx.version == 3
 
     def test_sapling_tx_with_spends(self):
         '''Test Sapling transaction with spends.'''
-        tx_hex = self.create_sapling_tx_hex(num_spends=2)
-        raw = bytes.fromhex(tx_hex)
+        raw = self.create_sapling_tx_bytes(num_spends=2)
         deser = tx_lib.DeserializerPIVX(raw)
         tx = deser.read_tx()
 
@@ -240,8 +306,7 @@ class TestDeserializerPIVXSapling:
 
     def test_sapling_tx_with_outputs(self):
         '''Test Sapling transaction with outputs.'''
-        tx_hex = self.create_sapling_tx_hex(num_outputs=3)
-        raw = bytes.fromhex(tx_hex)
+        raw = self.create_sapling_tx_bytes(num_outputs=3)
         deser = tx_lib.DeserializerPIVX(raw)
         tx = deser.read_tx()
 
@@ -261,12 +326,11 @@ class TestDeserializerPIVXSapling:
 
     def test_sapling_tx_with_both(self):
         '''Test Sapling transaction with both spends and outputs.'''
-        tx_hex = self.create_sapling_tx_hex(
+        raw = self.create_sapling_tx_bytes(
             num_spends=1,
             num_outputs=2,
             value_balance=500000,
         )
-        raw = bytes.fromhex(tx_hex)
         deser = tx_lib.DeserializerPIVX(raw)
         tx = deser.read_tx()
 
@@ -276,11 +340,39 @@ class TestDeserializerPIVXSapling:
         assert len(tx.sapling_spends) == 1
         assert len(tx.sapling_outputs) == 2
 
+    @pytest.mark.parametrize('expiry', (b'\xfd\x10\x27',
+                                        b'\xfe\xa0\x86\x01\x00'))
+    def test_multibyte_expiry(self, expiry):
+        '''Test a Sapling tx whose nExpiryHeight is not a one-byte varint.'''
+        raw = bytearray(self.create_sapling_tx_bytes(
+            num_spends=1, num_outputs=1, value_balance=-7, expiry=expiry))
+        raw[6:10] = _pack_u32(123456)  # locktime
+        spends_start = 10 + len(expiry) + 8 + 1
+        nullifier_start = spends_start + 64
+        raw[nullifier_start:nullifier_start+32] = b'\x01' * 32
+        cmu_start = spends_start + 384 + 1 + 32
+        raw[cmu_start:cmu_start+32] = b'\x02' * 32
+
+        deser = tx_lib.DeserializerPIVX(bytes(raw))
+        tx = deser.read_tx()
+
+        assert tx.locktime == 123456
+        assert tx.value_balance == -7
+        assert deser.cursor == len(raw)
+        assert tx.sapling_spends.nullifiers() == [b'\x01' * 32]
+        assert tx.sapling_spends[0].anchor == bytes(32)
+        assert tx.sapling_outputs.cmus() == [b'\x02' * 32]
+        assert tx.sapling_outputs[0].cv == bytes(32)
+
+        deser = tx_lib.DeserializerPIVX(bytes(raw))
+        assert deser.read_tx_nullifiers_and_cmus() == ([b'\x01' * 32],
+                                                       [b'\x02' * 32])
+        assert deser.cursor == len(raw)
+
     def test_sapling_nullifier_extraction(self):
         '''Test that nullifiers are correctly extracted.'''
         # Create tx with specific nullifier pattern
-        tx_hex = self.create_sapling_tx_hex(num_spends=1)
-        raw = bytearray.fromhex(tx_hex)
+        raw = bytearray(self.create_sapling_tx_bytes(num_spends=1))
 
         # Position of nullifier in spend (after cv:32, anchor:32 = 64 bytes
         # from start of spend data)
@@ -291,16 +383,16 @@ class TestDeserializerPIVXSapling:
         test_nullifier = bytes(range(32))
         raw[nullifier_start:nullifier_start+32] = test_nullifier
 
-        deser = tx_lib.DeserializerPIVX(bytes(raw))
+        deser = tx_lib.DeserializerPIVX(memoryview(raw))
         tx = deser.read_tx()
 
         assert isinstance(tx, tx_lib.TxPIVXSapling)
         assert tx.sapling_spends[0].nullifier == test_nullifier
+        assert type(tx.sapling_spends[0].nullifier) is bytes
 
     def test_sapling_commitment_extraction(self):
         '''Test that commitments (cmu) are correctly extracted.'''
-        tx_hex = self.create_sapling_tx_hex(num_outputs=1)
-        raw = bytearray.fromhex(tx_hex)
+        raw = bytearray(self.create_sapling_tx_bytes(num_outputs=1))
 
         # Position of cmu in output (after cv:32 = 32 bytes from start of
         # output data)
@@ -312,8 +404,73 @@ class TestDeserializerPIVXSapling:
         test_cmu = bytes(range(32))
         raw[cmu_start:cmu_start+32] = test_cmu
 
-        deser = tx_lib.DeserializerPIVX(bytes(raw))
+        deser = tx_lib.DeserializerPIVX(memoryview(raw))
         tx = deser.read_tx()
 
         assert isinstance(tx, tx_lib.TxPIVXSapling)
         assert tx.sapling_outputs[0].cmu == test_cmu
+        assert type(tx.sapling_outputs[0].cmu) is bytes
+        assert type(tx.binding_sig) is bytes
+
+    def test_parsed_fields_do_not_alias_input(self):
+        '''Test that mutating a bytearray after parsing leaves the tx intact.'''
+        raw = bytearray(self.create_sapling_tx_bytes(num_spends=1,
+                                                     num_outputs=1))
+        tx = tx_lib.DeserializerPIVX(raw).read_tx()
+        nullifier = tx.sapling_spends[0].nullifier
+        cmu = tx.sapling_outputs[0].cmu
+        spend_hash = hash(tx.sapling_spends[0])
+
+        raw[:] = b'\xff' * len(raw)
+        raw.append(0)
+
+        assert tx.sapling_spends[0].nullifier == nullifier
+        assert tx.sapling_outputs[0].cmu == cmu
+        assert hash(tx.sapling_spends[0]) == spend_hash
+
+    def test_sapling_batch_columns(self):
+        '''Test columnar access to the spend and output vectors.'''
+        raw = bytearray(self.create_sapling_tx_bytes(num_spends=3,
+                                                     num_outputs=2))
+        # Spend data starts 20 bytes in; output data follows it after the
+        # one-byte output count
+        spends_start = 20
+        outputs_start = spends_start + 3 * 384 + 1
+        for i in range(3):
+            nullifier_start = spends_start + i * 384 + 64
+            raw[nullifier_start:nullifier_start+32] = bytes([i + 1]) * 32
+        for i in range(2):
+            cmu_start = outputs_start + i * 948 + 32
+            raw[cmu_start:cmu_start+32] = bytes([i + 10]) * 32
+
+        deser = tx_lib.DeserializerPIVX(bytes(raw))
+        tx = deser.read_tx()
+
+        spends = tx.sapling_spends
+        assert isinstance(spends, tx_lib.SaplingSpendBatch)
+        assert spends.nullifiers() == [bytes([i + 1]) * 32 for i in range(3)]
+        assert spends.nullifiers() == [s.nullifier for s in spends]
+        assert spends.nullifier(2) == spends[-1].nullifier
+        assert spends.nullifier(-1) == spends[-1].nullifier == bytes([3]) * 32
+        assert spends.nullifier(-3) == bytes([1]) * 32
+        with pytest.raises(IndexError):
+            spends.nullifier(-4)
+        assert spends.anchors() == [bytes(32)] * 3
+        assert spends == list(spends)
+        assert list(spends) == spends
+        assert spends[1:] == [spends[1], spends[2]]
+        assert isinstance(spends[::2], tx_lib.SaplingSpendBatch)
+        assert spends[::2].nullifiers() == [bytes([1]) * 32, bytes([3]) * 32]
+        assert spends != list(spends)[:2]
+
+        outputs = tx.sapling_outputs
+        assert isinstance(outputs, tx_lib.SaplingOutputBatch)
+        assert outputs.cmus() == [bytes([i + 10]) * 32 for i in range(2)]
+        assert outputs.cmu(1) == outputs[1].cmu
+        assert outputs.cmu(-1) == outputs[-1].cmu == bytes([11]) * 32
+        with pytest.raises(IndexError):
+            outputs.cmu(2)
+
+        # A parsed tx equals one built from plain lists
+        assert tx == dataclasses.replace(tx, sapling_spends=list(spends),
+                                         sapling_outputs=list(outputs))
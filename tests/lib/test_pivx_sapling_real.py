@@ -6,23 +6,41 @@
 
 '''Integration tests for PIVX Sapling with real block data.'''
 
-import json
-import os
+from concurrent.futures import ThreadPoolExecutor
+import functools
+from pathlib import Path
+
+import pytest
 
 from electrumx.lib import tx as tx_lib
 from electrumx.lib import coins
+from electrumx.lib.util import json_deserialize
+
+# The fixtures hold multi-MB hex strings; use orjson if available
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json_deserialize
+
+_BLOCK_DIR = Path(__file__).resolve().parent.parent / 'blocks'
 
 
 class TestPIVXSaplingRealBlocks:
     '''Test PIVX Sapling deserialization with real mainnet blocks.'''
 
     @staticmethod
+    @functools.lru_cache(maxsize=8)
     def load_block(filename):
         '''Load a block from the tests/blocks directory.'''
-        base_path = os.path.dirname(os.path.dirname(__file__))
-        block_path = os.path.join(base_path, 'blocks', filename)
-        with open(block_path, 'r') as f:
-            return json.load(f)
+        return _json_loads((_BLOCK_DIR / filename).read_bytes())
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def load_block_raw(filename):
+        '''Return the raw bytes of a block from the tests/blocks directory.'''
+        block_data = TestPIVXSaplingRealBlocks.load_block(filename)
+        return bytes.fromhex(block_data['block'])
 
     def test_block_2703076_shielding_tx(self):
         '''Test block 2703076 which contains a shielding transaction.
@@ -37,7 +55,7 @@ class TestPIVXSaplingRealBlocks:
         assert block_data['height'] > coins.Pivx.SAPLING_START_HEIGHT
 
         # Parse the raw block
-        raw_block = bytes.fromhex(block_data['block'])
+        raw_block = self.load_block_raw('pivx_mainnet_2703076.json')
 
         # The block header for post-Sapling PIVX is 112 bytes
         header_len = coins.Pivx.static_header_len(block_data['height'])
@@ -100,7 +118,7 @@ class TestPIVXSaplingRealBlocks:
         assert block_data['height'] < coins.Pivx.SAPLING_START_HEIGHT
 
         # Parse the raw block
-        raw_block = bytes.fromhex(block_data['block'])
+        raw_block = self.load_block_raw('pivx_mainnet_10000.json')
 
         # Pre-Sapling header is 80 bytes
         header_len = coins.Pivx.static_header_len(block_data['height'])
@@ -117,8 +135,7 @@ class TestPIVXSaplingRealBlocks:
 
         # Verify transactions are TxPIVX but not TxPIVXSapling
         for tx in txs:
-            assert isinstance(tx, tx_lib.TxPIVX)
-            assert not isinstance(tx, tx_lib.TxPIVXSapling)
+            assert type(tx) is tx_lib.TxPIVX
 
     def test_zerocoin_era_block_1000000(self):
         '''Test block during Zerocoin era (has expanded header).'''
@@ -131,7 +148,7 @@ class TestPIVXSaplingRealBlocks:
         header_len = coins.Pivx.static_header_len(height)
         assert header_len == 112
 
-        raw_block = bytes.fromhex(block_data['block'])
+        raw_block = self.load_block_raw('pivx_mainnet_1000000.json')
         deser = tx_lib.DeserializerPIVX(raw_block, start=header_len)
         tx_count = deser._read_varint()
 
@@ -157,7 +174,7 @@ class TestPIVXSaplingRealBlocks:
         assert block_data['height'] == 5057529
         assert block_data['height'] > coins.Pivx.SAPLING_START_HEIGHT
 
-        raw_block = bytes.fromhex(block_data['block'])
+        raw_block = self.load_block_raw('pivx_mainnet_5057529.json')
         header_len = coins.Pivx.static_header_len(block_data['height'])
         assert header_len == 112
 
@@ -173,7 +190,7 @@ class TestPIVXSaplingRealBlocks:
         # Third transaction should be TxPIVXSapling with spends
         tx3 = txs[2]
         assert isinstance(tx3, tx_lib.TxPIVXSapling)
-        assert tx3.txid[::-1].hex() == block_data['tx'][2]
+        assert tx3.txid_hex_be == block_data['tx'][2]
 
         # Verify unshielding: positive value_balance means funds leaving
         # shielded pool
@@ -189,6 +206,10 @@ class TestPIVXSaplingRealBlocks:
         # Verify anchors (both spends use same anchor - same tree state)
         anchors = [s.anchor for s in tx3.sapling_spends]
         assert anchors[0] == anchors[1]
+        # and the anchor column holds them as one object
+        column = tx3.sapling_spends.anchors()
+        assert column == anchors
+        assert column[0] is column[1]
 
         # Verify 2 outputs (change back to shielded)
         assert len(tx3.sapling_outputs) == 2
@@ -248,7 +269,9 @@ class TestSaplingDataExtraction:
             'pivx_mainnet_2703076.json'
         )
 
-        raw_block = bytes.fromhex(block_data['block'])
+        raw_block = TestPIVXSaplingRealBlocks.load_block_raw(
+            'pivx_mainnet_2703076.json'
+        )
         header_len = coins.Pivx.static_header_len(block_data['height'])
 
         deser = tx_lib.DeserializerPIVX(raw_block, start=header_len)
@@ -264,13 +287,21 @@ class TestSaplingDataExtraction:
         # Nullifiers should be unique (no double-spends in valid block)
         assert len(all_nullifiers) == len(set(all_nullifiers))
 
+        # The whole-block batch path agrees
+        nullifiers = tx_lib.DeserializerPIVX.read_block_nullifiers(
+            raw_block, header_len)
+        assert nullifiers == b''.join(all_nullifiers)
+        assert tx_lib.DeserializerPIVX.nullifiers_are_unique(nullifiers)
+
     def test_commitment_extraction(self):
         '''Test that commitments can be extracted for indexing.'''
         block_data = TestPIVXSaplingRealBlocks.load_block(
             'pivx_mainnet_2703076.json'
         )
 
-        raw_block = bytes.fromhex(block_data['block'])
+        raw_block = TestPIVXSaplingRealBlocks.load_block_raw(
+            'pivx_mainnet_2703076.json'
+        )
         header_len = coins.Pivx.static_header_len(block_data['height'])
 
         deser = tx_lib.DeserializerPIVX(raw_block, start=header_len)
@@ -293,7 +324,9 @@ class TestSaplingDataExtraction:
             'pivx_mainnet_2703076.json'
         )
 
-        raw_block = bytes.fromhex(block_data['block'])
+        raw_block = TestPIVXSaplingRealBlocks.load_block_raw(
+            'pivx_mainnet_2703076.json'
+        )
         header_len = coins.Pivx.static_header_len(block_data['height'])
 
         deser = tx_lib.DeserializerPIVX(raw_block, start=header_len)
@@ -309,3 +342,60 @@ class TestSaplingDataExtraction:
         # All anchors should be 32 bytes (Merkle tree roots)
         for anchor in anchors:
             assert len(anchor) == 32
+
+    def test_nullifiers_and_cmus_fast_path(self):
+        '''Test read_tx_nullifiers_and_cmus() agrees with read_tx().'''
+        for filename in ('pivx_mainnet_10000.json',
+                         'pivx_mainnet_2703076.json',
+                         'pivx_mainnet_5057529.json'):
+            block_data = TestPIVXSaplingRealBlocks.load_block(filename)
+            raw_block = TestPIVXSaplingRealBlocks.load_block_raw(filename)
+            header_len = coins.Pivx.static_header_len(block_data['height'])
+
+            deser = tx_lib.DeserializerPIVX(raw_block, start=header_len)
+            fast = tx_lib.DeserializerPIVX(raw_block, start=header_len)
+            tx_count = deser._read_varint()
+            assert fast._read_varint() == tx_count
+
+            for _ in range(tx_count):
+                tx = deser.read_tx()
+                nullifiers, cmus = fast.read_tx_nullifiers_and_cmus()
+                assert fast.cursor == deser.cursor
+                if isinstance(tx, tx_lib.TxPIVXSapling):
+                    assert nullifiers == [s.nullifier
+                                          for s in tx.sapling_spends]
+                    assert cmus == [o.cmu for o in tx.sapling_outputs]
+                else:
+                    assert nullifiers == cmus == []
+
+    def test_tx_spans(self):
+        '''Test scanning tx spans and parsing them independently.'''
+        block_data = TestPIVXSaplingRealBlocks.load_block(
+            'pivx_mainnet_2703076.json'
+        )
+        raw_block = TestPIVXSaplingRealBlocks.load_block_raw(
+            'pivx_mainnet_2703076.json'
+        )
+        header_len = coins.Pivx.static_header_len(block_data['height'])
+
+        deser = tx_lib.DeserializerPIVX(raw_block, start=header_len)
+        tx_count = deser._read_varint()
+        spans = tx_lib.DeserializerPIVX.scan_tx_spans(
+            raw_block, deser.cursor, tx_count)
+        txs = [deser.read_tx() for _ in range(tx_count)]
+
+        assert len(spans) == tx_count
+        assert spans[-1][1] == deser.cursor
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            assert end == start
+
+        assert tx_lib.DeserializerPIVX.read_tx_spans(raw_block, spans) == txs
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert tx_lib.DeserializerPIVX.read_tx_spans(
+                raw_block, spans, executor) == txs
+
+        # A span whose end disagrees with the parse is rejected
+        start, end = spans[0]
+        with pytest.raises(AssertionError):
+            tx_lib.DeserializerPIVX.read_tx_spans(raw_block,
+                                                  [(start, end - 1)])